@@ -1,21 +1,54 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
+from typing import Optional
 import io
 import json
-from app.core.processor import process_deals
+import os
+import secrets
+from app.core.processor import process_deals, process_deals_by_owner
+from app.utils.profiling import profile_run, ProfileInProgressError
 
 router = APIRouter()
 
+def _check_profile_token(token: Optional[str]):
+    """Allow profiling only for callers presenting the configured PROFILE_TOKEN."""
+    expected = os.getenv("PROFILE_TOKEN")
+    if not expected or not token or not secrets.compare_digest(token.encode(), expected.encode()):
+        raise HTTPException(status_code=403, detail="Profiling requires a valid X-Profile-Token header")
+
 @router.get("/")
 async def get_root():
     """Return a simple message."""
     return {"message": "Welcome to the Mini Nudge Agent API!"}
 
 @router.get("/nudges")
-async def get_nudges():
-    """Stream nudge results as JSON."""
-    nudges = process_deals()
+async def get_nudges(
+    profile: bool = False,
+    by_owner: bool = False,
+    x_profile_token: Optional[str] = Header(default=None),
+):
+    """Stream nudge results as JSON, grouped by deal owner when by_owner=1 and with a profile report when profile=1."""
+    run = process_deals_by_owner if by_owner else process_deals
+    if profile:
+        _check_profile_token(x_profile_token)
+        # Profiled runs bypass both the run and per-prompt coalescing so every stage measures its own work
+        # rather than a wait on another request. On Python 3.12+ the profile is process-wide and includes other requests.
+        try:
+            result, report = await run_in_threadpool(profile_run, run, coalesce=False)
+        except ProfileInProgressError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+    else:
+        # Run off the event loop so concurrent requests can share one computation
+        result = await run_in_threadpool(run)
+
+    if by_owner:
+        payload = {owner: [nudge.dict() for nudge in nudges] for owner, nudges in result.items()}
+    else:
+        payload = [nudge.dict() for nudge in result]
+    if profile:
+        payload = {"nudges": payload, "profile": report}
     output = io.StringIO()
-    json.dump([nudge.dict() for nudge in nudges], output, indent=2)
+    json.dump(payload, output, indent=2)
     output.seek(0)
-    return StreamingResponse(output, media_type="application/json")
\ No newline at end of file
+    return StreamingResponse(output, media_type="application/json")
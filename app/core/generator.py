@@ -1,11 +1,22 @@
 from openai import OpenAI, OpenAIError
 from dotenv import load_dotenv
 import os
+from app.utils.singleflight import SingleFlight
 
 
 load_dotenv()
 
-def generate_nudge(deal_id: str, contact: str, tone: str, reply_speed: float, deal_name: str, stage: str) -> str:
+# Prevents the same prompt from being sent twice at the same time
+_nudge_flight = SingleFlight()
+
+def generate_nudge(deal_id: str, contact: str, tone: str, reply_speed: float, deal_name: str, stage: str, coalesce: bool = True) -> str:
+    """Generate a nudge, sharing the result with concurrent calls for the same prompt unless coalesce is False."""
+    if not coalesce:
+        return _generate_nudge(deal_id, contact, tone, reply_speed, deal_name, stage)
+    key = (deal_id, contact, tone, f"{reply_speed:.0f}", deal_name, stage)
+    return _nudge_flight.do(key, _generate_nudge, deal_id, contact, tone, reply_speed, deal_name, stage)
+
+def _generate_nudge(deal_id: str, contact: str, tone: str, reply_speed: float, deal_name: str, stage: str) -> str:
     """Generate a nudge using OpenAI GPT-3.5-Turbo."""
     if not all([deal_id, contact, tone, deal_name, stage]):
         print(f"Invalid input for deal {deal_id}. Missing required fields.")
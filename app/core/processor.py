@@ -1,15 +1,20 @@
 import os
 import pandas as pd
 from datetime import datetime, timezone
-from typing import List, Dict
+from typing import List, Dict, Iterator, Optional, Set, Tuple
 from statistics import median
 from app.core.model import Nudge
-from app.utils.helpers import load_data
+from app.utils.helpers import load_data, data_fingerprint
+from app.utils.singleflight import SingleFlight
+from app.utils.profiling import stage
 from dotenv import load_dotenv
 load_dotenv()
 MIN_IDLE_DAYS = 7
 MIN_URGENCY = 250
 
+# Shares one run between concurrent callers with the same inputs
+_deals_flight = SingleFlight()
+
 def calculate_idle_days(last_activity: str, today: datetime) -> float:
     """Calculate idle days since last activity, ignoring time of day."""
     try:
@@ -40,26 +45,67 @@ def calculate_reply_speed(thread: List[Dict], your_email: str, client_email: str
                 continue
     return median(reply_gaps) if reply_gaps else float('inf')
 
-def process_deals(today: datetime = datetime.now(timezone.utc)) -> List[Nudge]:
-    """Process deals and generate nudges for stalled opportunities."""
-    from app.core.classifier import detect_tone
-    from app.core.generator import generate_nudge
-    
+def index_threads(emails: List[Dict]) -> Dict[str, Dict]:
+    """Index email threads by deal_id, keeping the first thread seen for each deal."""
+    threads = {}
+    for email in emails:
+        threads.setdefault(email.get('deal_id'), email)
+    return threads
+
+def known_reps(crm_df: pd.DataFrame) -> Set[str]:
+    """Collect rep addresses from the CRM owner column, YOUR_EMAIL and the comma-separated REP_EMAILS setting."""
+    reps = {email.strip() for email in (os.getenv("REP_EMAILS") or "").split(",") if email.strip()}
+    your_email = (os.getenv("YOUR_EMAIL") or "").strip()
+    if your_email:
+        reps.add(your_email)
+    if 'owner' in crm_df.columns:
+        reps.update(owner.strip() for owner in crm_df['owner'] if isinstance(owner, str) and owner.strip())
+    return reps
+
+def resolve_owner(row: pd.Series, thread: List[Dict], reps: Set[str]) -> Optional[str]:
+    """Resolve a deal's owner from its CRM owner column, else from the rep taking part in the thread."""
+    owner = row.get('owner')
+    if isinstance(owner, str) and owner.strip():
+        return owner.strip()
+    for msg in thread:
+        for address in (msg.get('from'), msg.get('to')):
+            if address in reps:
+                return address
+    return None
+
+def process_deals(today: datetime = datetime.now(timezone.utc), coalesce: bool = True) -> List[Nudge]:
+    """Process deals and generate nudges, coalescing concurrent runs over the same data and day."""
+    if not coalesce:
+        return _process_deals(today, coalesce=False)
+    key = ("single", data_fingerprint(), today.date())
+    return _deals_flight.do(key, _process_deals, today)
+
+def process_deals_by_owner(today: datetime = datetime.now(timezone.utc), coalesce: bool = True) -> Dict[str, List[Nudge]]:
+    """Process every rep's deals in one pass and group the nudges by deal owner."""
+    if not coalesce:
+        return _process_deals_by_owner(today, coalesce=False)
+    key = ("by_owner", data_fingerprint(), today.date())
+    return _deals_flight.do(key, _process_deals_by_owner, today)
+
+def _load_deals() -> Optional[Tuple[pd.DataFrame, Dict[str, Dict]]]:
+    """Load CRM rows and index their email threads, or return None if loading fails."""
     try:
-        crm_df, emails = load_data()
+        with stage("load_data"):
+            crm_df, emails = load_data()
     except Exception as e:
         print(f"Error loading data: {e}")
-        return []
-    
-    nudges = []
-    your_email = os.getenv("YOUR_EMAIL") 
-    
+        return None
+    return crm_df, index_threads(emails)
+
+def _stalled_deals(crm_df: pd.DataFrame, threads: Dict[str, Dict], today: datetime) -> Iterator[Tuple[pd.Series, float, List[Dict]]]:
+    """Yield (row, urgency, valid_thread) for idle, urgent deals with a usable email thread."""
     for _, row in crm_df.iterrows():
         deal_id = row['deal_id']
         if not row['stage'] or not row['deal_name']:
             print(f"Deal {deal_id} skipped: invalid stage or deal_name")
             continue
-        idle_days = calculate_idle_days(row['last_activity'], today)
+        with stage("idle_days"):
+            idle_days = calculate_idle_days(row['last_activity'], today)
         if idle_days < MIN_IDLE_DAYS:
             print(f"Deal {deal_id} skipped: idle_days={idle_days} < {MIN_IDLE_DAYS}")
             continue
@@ -68,7 +114,7 @@ def process_deals(today: datetime = datetime.now(timezone.utc)) -> List[Nudge]:
             print(f"Deal {deal_id} skipped: urgency={urgency} <= {MIN_URGENCY}")
             continue
         
-        email_thread = next((e for e in emails if e.get('deal_id') == deal_id), None)
+        email_thread = threads.get(deal_id)
         if not email_thread or not email_thread.get('thread'):
             print(f"No valid email thread for deal {deal_id}. Skipping.")
             continue
@@ -79,22 +125,65 @@ def process_deals(today: datetime = datetime.now(timezone.utc)) -> List[Nudge]:
             print(f"No valid messages in thread for deal {deal_id}. Skipping.")
             continue
         
-        contact = next((msg['to'] for msg in valid_thread if msg.get('to') != your_email), None)
-        if not contact:
-            print(f"No valid contact for deal {deal_id}. Skipping.")
-            continue
-        
-        reply_speed = calculate_reply_speed(valid_thread, your_email, contact)
+        yield row, urgency, valid_thread
+
+def _build_nudge(row: pd.Series, urgency: float, valid_thread: List[Dict], owner: Optional[str], reps: Set[Optional[str]], coalesce: bool = True) -> Optional[Nudge]:
+    """Score a stalled deal against its owner and generate the nudge, taking the first non-rep recipient as contact."""
+    from app.core.classifier import detect_tone
+    from app.core.generator import generate_nudge
+
+    deal_id = row['deal_id']
+    contact = next((msg['to'] for msg in valid_thread if msg.get('to') not in reps), None)
+    if not contact:
+        print(f"No valid contact for deal {deal_id}. Skipping.")
+        return None
+    
+    with stage("reply_speed"):
+        reply_speed = calculate_reply_speed(valid_thread, owner, contact)
+    with stage("tone"):
         tone = detect_tone(valid_thread[-1].get('body', '') , clf=None) if valid_thread else "formal"
-        nudge_text = generate_nudge(deal_id, contact, tone, reply_speed, row['deal_name'], row['stage'])
-        
-        nudges.append(Nudge(
-            deal_id=deal_id,
-            contact=contact,
-            nudge=nudge_text,
-            urgency=int(urgency),
-            reply_speed=round(reply_speed, 1),
-            tone=tone
-        ))
+    with stage("generate"):
+        nudge_text = generate_nudge(deal_id, contact, tone, reply_speed, row['deal_name'], row['stage'], coalesce=coalesce)
     
-    return nudges
\ No newline at end of file
+    return Nudge(
+        deal_id=deal_id,
+        contact=contact,
+        nudge=nudge_text,
+        urgency=int(urgency),
+        reply_speed=round(reply_speed, 1),
+        tone=tone
+    )
+
+def _process_deals(today: datetime, coalesce: bool = True) -> List[Nudge]:
+    """Process deals and generate nudges for stalled opportunities owned by YOUR_EMAIL."""
+    loaded = _load_deals()
+    if loaded is None:
+        return []
+    crm_df, threads = loaded
+    your_email = os.getenv("YOUR_EMAIL")
+    
+    nudges = []
+    for row, urgency, valid_thread in _stalled_deals(crm_df, threads, today):
+        nudge = _build_nudge(row, urgency, valid_thread, your_email, {your_email}, coalesce)
+        if nudge:
+            nudges.append(nudge)
+    return nudges
+
+def _process_deals_by_owner(today: datetime, coalesce: bool = True) -> Dict[str, List[Nudge]]:
+    """Process all reps' deals over a single load and group nudges by owner."""
+    loaded = _load_deals()
+    if loaded is None:
+        return {}
+    crm_df, threads = loaded
+    reps = known_reps(crm_df)
+    
+    grouped: Dict[str, List[Nudge]] = {}
+    for row, urgency, valid_thread in _stalled_deals(crm_df, threads, today):
+        owner = resolve_owner(row, valid_thread, reps)
+        if not owner:
+            print(f"No owner for deal {row['deal_id']}. Skipping.")
+            continue
+        nudge = _build_nudge(row, urgency, valid_thread, owner, reps, coalesce)
+        if nudge:
+            grouped.setdefault(owner, []).append(nudge)
+    return grouped
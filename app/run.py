@@ -1,10 +1,34 @@
-from app.core.processor import process_deals
+import argparse
+from app.core.processor import process_deals, process_deals_by_owner
 from app.utils.helpers import save_nudges
+from app.utils.profiling import profile_run, format_stage_report
 
-def main():
-    nudges = process_deals()
-    save_nudges([nudge.model_dump() for nudge in nudges])
-    print(f"✅ Generated {len(nudges)} nudges, saved to out/nudges.json")
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate nudges for stalled deals.")
+    parser.add_argument("--profile", action="store_true",
+                        help="profile the run and write .pstats and .collapsed files to out/")
+    parser.add_argument("--by-owner", action="store_true",
+                        help="process every rep's deals in one pass and group nudges by owner")
+    args = parser.parse_args(argv)
+
+    run = process_deals_by_owner if args.by_owner else process_deals
+    if args.profile:
+        result, report = profile_run(run, coalesce=False)
+    else:
+        result = run()
+
+    if args.by_owner:
+        output_path = "out/nudges_by_owner.json"
+        save_nudges({owner: [nudge.model_dump() for nudge in nudges] for owner, nudges in result.items()}, output_path)
+        total = sum(len(nudges) for nudges in result.values())
+        print(f"✅ Generated {total} nudges for {len(result)} owners, saved to {output_path}")
+    else:
+        save_nudges([nudge.model_dump() for nudge in result])
+        print(f"✅ Generated {len(result)} nudges, saved to out/nudges.json")
+
+    if args.profile:
+        print(format_stage_report(report["stages"]))
+        print(f"📈 Profile saved to {report['pstats']} and {report['collapsed']}")
 
 if __name__ == "__main__":
     main()
@@ -52,8 +52,19 @@ def load_data(crm_path: str = "data/crm_events.csv", email_path: str = "data/ema
         print(f"Error loading data: {e}")
         raise
 
-def save_nudges(nudges: list, output_path: str = "out/nudges.json"):
-    """Save nudges to output file."""
+def data_fingerprint(crm_path: str = "data/crm_events.csv", email_path: str = "data/emails.json") -> tuple:
+    """Identify the current input files by path, size and mtime without parsing them."""
+    fingerprint = []
+    for path in (crm_path, email_path):
+        try:
+            stat = os.stat(path)
+            fingerprint.append((path, stat.st_size, stat.st_mtime_ns))
+        except OSError:
+            fingerprint.append((path, None, None))
+    return tuple(fingerprint)
+
+def save_nudges(nudges: list | dict, output_path: str = "out/nudges.json"):
+    """Save nudges, or nudges grouped by owner, to output file."""
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     with open(output_path, 'w') as f:
         json.dump(nudges, f, indent=2)
\ No newline at end of file
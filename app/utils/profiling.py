@@ -0,0 +1,135 @@
+import cProfile
+import contextvars
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Stage timings of the profiled run in the current context; None when profiling is off
+_stage_times: contextvars.ContextVar[Optional[Dict[str, Dict[str, float]]]] = contextvars.ContextVar(
+    "stage_times", default=None
+)
+_disabled = nullcontext()
+
+# cProfile allows a single active profiler per process on Python 3.12+
+_profile_lock = threading.Lock()
+
+# Call-graph branches below this share of the total are dropped from the collapsed stacks
+MIN_STACK_FRACTION = 0.001
+
+class ProfileInProgressError(RuntimeError):
+    """Raised when a profiled run is requested while another one is still running."""
+
+def stage(name: str):
+    """Time a pipeline stage when a profiled run is active; a shared no-op otherwise."""
+    if _stage_times.get() is None:
+        return _disabled
+    return _timed_stage(name)
+
+@contextmanager
+def _timed_stage(name: str):
+    times = _stage_times.get()
+    wall_start, cpu_start = time.perf_counter(), time.thread_time()
+    try:
+        yield
+    finally:
+        entry = times.setdefault(name, {"wall_s": 0.0, "cpu_s": 0.0, "calls": 0})
+        entry["wall_s"] += time.perf_counter() - wall_start
+        entry["cpu_s"] += time.thread_time() - cpu_start
+        entry["calls"] += 1
+
+def _func_label(func: Tuple[str, int, str]) -> str:
+    filename, line, name = func
+    if filename == "~":
+        return name
+    return f"{os.path.basename(filename)}:{line}:{name}"
+
+def write_collapsed_stacks(stats: pstats.Stats, output_path: str):
+    """Write pstats data as collapsed stacks ("a;b;c <microseconds>") for flamegraph tools.
+
+    cProfile only records caller/callee edges, so time is split across callers
+    in proportion to each edge's cumulative time.
+    """
+    raw = stats.stats
+    callees: Dict[Tuple, Dict[Tuple, float]] = {}
+    for func, (_, _, _, _, callers) in raw.items():
+        for caller, (_, _, _, edge_ct) in callers.items():
+            callees.setdefault(caller, {})[func] = edge_ct
+
+    roots = [func for func, (_, _, _, _, callers) in raw.items() if not callers]
+    total = sum(raw[func][3] for func in roots) or stats.total_tt
+    threshold = total * MIN_STACK_FRACTION
+    lines: Dict[str, float] = {}
+
+    def walk(func, inclusive: float, path: Tuple[str, ...], seen: frozenset):
+        _, _, tt, ct, _ = raw[func]
+        path = path + (_func_label(func),)
+        scale = inclusive / ct if ct else 0.0
+        key = ";".join(path)
+        lines[key] = lines.get(key, 0.0) + tt * scale
+        for callee, edge_ct in callees.get(func, {}).items():
+            share = edge_ct * scale
+            if callee in seen or share < threshold:
+                continue
+            walk(callee, share, path, seen | {callee})
+
+    for root in roots:
+        walk(root, raw[root][3], (), frozenset({root}))
+
+    with open(output_path, "w") as f:
+        for key, seconds in sorted(lines.items()):
+            micros = int(seconds * 1_000_000)
+            if micros > 0:
+                f.write(f"{key} {micros}\n")
+
+def format_stage_report(stages: Dict[str, Dict[str, float]]) -> str:
+    """Render the per-stage wall/CPU breakdown as a small text table."""
+    rows = [f"{'stage':<14}{'calls':>7}{'wall (s)':>11}{'cpu (s)':>11}"]
+    for name, entry in sorted(stages.items(), key=lambda item: item[1]["wall_s"], reverse=True):
+        rows.append(f"{name:<14}{entry['calls']:>7}{entry['wall_s']:>11.4f}{entry['cpu_s']:>11.4f}")
+    return "\n".join(rows)
+
+def profile_run(fn: Callable[..., Any], *args, output_dir: str = "out", **kwargs) -> Tuple[Any, Dict]:
+    """Run fn under cProfile and stage timers, writing .pstats and .collapsed files to output_dir.
+
+    Only one profiled run may be active at a time; a concurrent call raises
+    ProfileInProgressError. On Python 3.12+ cProfile is process-wide, so a
+    profile taken inside the server also records work from other threads.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfileInProgressError("Another profiled run is already in progress")
+    try:
+        return _profile_run(fn, *args, output_dir=output_dir, **kwargs)
+    finally:
+        _profile_lock.release()
+
+def _profile_run(fn: Callable[..., Any], *args, output_dir: str, **kwargs) -> Tuple[Any, Dict]:
+    os.makedirs(output_dir, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    pstats_path = os.path.join(output_dir, f"profile-{stamp}.pstats")
+    collapsed_path = os.path.join(output_dir, f"profile-{stamp}.collapsed")
+
+    stages: Dict[str, Dict[str, float]] = {}
+    token = _stage_times.set(stages)
+    profiler = cProfile.Profile()
+    wall_start, cpu_start = time.perf_counter(), time.thread_time()
+    try:
+        result = profiler.runcall(fn, *args, **kwargs)
+    finally:
+        wall_total = time.perf_counter() - wall_start
+        cpu_total = time.thread_time() - cpu_start
+        _stage_times.reset(token)
+
+    profiler.dump_stats(pstats_path)
+    write_collapsed_stacks(pstats.Stats(profiler), collapsed_path)
+
+    stages["total"] = {"wall_s": wall_total, "cpu_s": cpu_total, "calls": 1}
+    report = {
+        "stages": {name: {k: round(v, 6) for k, v in entry.items()} for name, entry in stages.items()},
+        "pstats": pstats_path,
+        "collapsed": collapsed_path,
+    }
+    return result, report
@@ -0,0 +1,79 @@
+import os
+import pstats
+import threading
+import pytest
+from app.utils.profiling import stage, profile_run, format_stage_report, ProfileInProgressError, _disabled
+
+def _pipeline():
+    with stage("load_data"):
+        sum(range(10000))
+    for _ in range(3):
+        with stage("tone"):
+            sorted(range(1000), reverse=True)
+    return "done"
+
+def test_stage_is_noop_when_disabled():
+    """Test stages return the shared no-op context outside a profiled run."""
+    assert stage("load_data") is _disabled
+    assert _pipeline() == "done"
+
+def test_profile_run_writes_outputs(tmp_path):
+    """Test a profiled run returns the result, stage timings and profile files."""
+    result, report = profile_run(_pipeline, output_dir=str(tmp_path))
+
+    assert result == "done"
+    assert report["stages"]["load_data"]["calls"] == 1
+    assert report["stages"]["tone"]["calls"] == 3
+    assert report["stages"]["total"]["wall_s"] >= report["stages"]["tone"]["wall_s"]
+
+    assert os.path.exists(report["pstats"])
+    pstats.Stats(report["pstats"])  # Loadable by the standard tooling
+
+    with open(report["collapsed"]) as f:
+        lines = f.read().splitlines()
+    assert lines
+    for line in lines:
+        stack, micros = line.rsplit(" ", 1)
+        assert stack and int(micros) > 0
+    assert any("_pipeline" in line for line in lines)
+
+    # Stage timing is switched off again once the run finishes
+    assert stage("tone") is _disabled
+
+def test_format_stage_report():
+    """Test the stage breakdown is rendered slowest first."""
+    report = format_stage_report({
+        "tone": {"wall_s": 0.1, "cpu_s": 0.1, "calls": 2},
+        "generate": {"wall_s": 2.0, "cpu_s": 0.01, "calls": 2},
+    })
+    lines = report.splitlines()
+    assert lines[0].startswith("stage")
+    assert lines[1].startswith("generate")
+    assert lines[2].startswith("tone")
+
+def test_concurrent_profiles_are_rejected(tmp_path):
+    """Test a second profiled run fails fast while another one is still running."""
+    started, release = threading.Event(), threading.Event()
+    outcome = {}
+
+    def blocking():
+        started.set()
+        release.wait(5)
+        return "first"
+
+    def first_run():
+        outcome["first"] = profile_run(blocking, output_dir=str(tmp_path))[0]
+
+    thread = threading.Thread(target=first_run)
+    thread.start()
+    assert started.wait(5)
+    try:
+        with pytest.raises(ProfileInProgressError):
+            profile_run(_pipeline, output_dir=str(tmp_path))
+    finally:
+        release.set()
+        thread.join()
+
+    assert outcome["first"] == "first"
+    # The lock is released once the first run finishes
+    assert profile_run(_pipeline, output_dir=str(tmp_path))[0] == "done"
@@ -0,0 +1,71 @@
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+from app.api.routes import _check_profile_token
+from app.core.model import Nudge
+from app.main import app
+from app.utils.profiling import ProfileInProgressError
+
+client = TestClient(app)
+
+@pytest.mark.parametrize(
+    "token",
+    [None, "", "wrong-token", "s\xe9cret"],
+    ids=["missing", "empty", "wrong", "non_ascii"],
+)
+def test_check_profile_token_rejects_invalid(token, monkeypatch):
+    monkeypatch.setenv("PROFILE_TOKEN", "secret")
+    with pytest.raises(HTTPException) as exc:
+        _check_profile_token(token)
+    assert exc.value.status_code == 403
+
+def test_check_profile_token_requires_configured_token(monkeypatch):
+    monkeypatch.delenv("PROFILE_TOKEN", raising=False)
+    with pytest.raises(HTTPException) as exc:
+        _check_profile_token("secret")
+    assert exc.value.status_code == 403
+
+def test_check_profile_token_accepts_valid(monkeypatch):
+    monkeypatch.setenv("PROFILE_TOKEN", "secret")
+    _check_profile_token("secret")
+
+@pytest.mark.parametrize(
+    "headers",
+    [{}, {"X-Profile-Token": "wrong-token"}, {"X-Profile-Token": b"s\xe9cret"}],
+    ids=["missing", "wrong", "latin1_byte"],
+)
+def test_get_nudges_profile_forbidden(headers, monkeypatch):
+    monkeypatch.setenv("PROFILE_TOKEN", "secret")
+    with patch("app.api.routes.profile_run") as mock_profile_run:
+        response = client.get("/nudges?profile=1", headers=headers)
+    assert response.status_code == 403
+    mock_profile_run.assert_not_called()
+
+def test_get_nudges_profile_conflict(monkeypatch):
+    monkeypatch.setenv("PROFILE_TOKEN", "secret")
+    with patch("app.api.routes.profile_run", side_effect=ProfileInProgressError("busy")):
+        response = client.get("/nudges?profile=1", headers={"X-Profile-Token": "secret"})
+    assert response.status_code == 409
+
+def test_get_nudges_profile_returns_report(monkeypatch):
+    monkeypatch.setenv("PROFILE_TOKEN", "secret")
+    nudge = Nudge(deal_id="OPP-123", contact="marie.cfo@acme.com", nudge="Send the pricing doc", urgency=45000, reply_speed=45.0, tone="formal")
+    report = {"stages": {"total": {"wall_s": 0.1, "cpu_s": 0.1, "calls": 1}}, "pstats": "out/p.pstats", "collapsed": "out/p.collapsed"}
+    with patch("app.api.routes.profile_run", return_value=([nudge], report)) as mock_profile_run:
+        response = client.get("/nudges?profile=1", headers={"X-Profile-Token": "secret"})
+
+    assert response.status_code == 200
+    assert response.json() == {"nudges": [nudge.model_dump()], "profile": report}
+    assert mock_profile_run.call_args.kwargs == {"coalesce": False}
+
+def test_get_nudges_by_owner_groups_results():
+    nudge = Nudge(deal_id="OPP-123", contact="marie.cfo@acme.com", nudge="Send the pricing doc", urgency=45000, reply_speed=45.0, tone="formal")
+    with patch("app.api.routes.process_deals_by_owner", return_value={"rep.a@nudge.ai": [nudge]}) as mock_by_owner, \
+            patch("app.api.routes.process_deals") as mock_process_deals:
+        response = client.get("/nudges?by_owner=1")
+
+    assert response.status_code == 200
+    assert response.json() == {"rep.a@nudge.ai": [nudge.model_dump()]}
+    mock_by_owner.assert_called_once()
+    mock_process_deals.assert_not_called()
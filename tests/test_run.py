@@ -0,0 +1,23 @@
+from unittest.mock import patch
+from app.core.model import Nudge
+from app.run import main
+
+def test_main_by_owner_saves_grouped_nudges():
+    nudge = Nudge(deal_id="OPP-123", contact="marie.cfo@acme.com", nudge="Send the pricing doc", urgency=45000, reply_speed=45.0, tone="formal")
+    with patch("app.run.process_deals_by_owner", return_value={"rep.a@nudge.ai": [nudge]}), \
+            patch("app.run.process_deals") as mock_process_deals, \
+            patch("app.run.save_nudges") as mock_save_nudges:
+        main(["--by-owner"])
+
+    mock_process_deals.assert_not_called()
+    mock_save_nudges.assert_called_once_with(
+        {"rep.a@nudge.ai": [nudge.model_dump()]}, "out/nudges_by_owner.json"
+    )
+
+def test_main_saves_flat_nudges():
+    nudge = Nudge(deal_id="OPP-123", contact="marie.cfo@acme.com", nudge="Send the pricing doc", urgency=45000, reply_speed=45.0, tone="formal")
+    with patch("app.run.process_deals", return_value=[nudge]), \
+            patch("app.run.save_nudges") as mock_save_nudges:
+        main([])
+
+    mock_save_nudges.assert_called_once_with([nudge.model_dump()])
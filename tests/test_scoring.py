@@ -3,7 +3,7 @@ import pandas as pd
 from datetime import datetime, timezone
 from statistics import median
 from unittest.mock import patch, MagicMock
-from app.core.processor import calculate_idle_days, calculate_reply_speed, process_deals
+from app.core.processor import calculate_idle_days, calculate_reply_speed, process_deals, process_deals_by_owner, resolve_owner
 from app.utils.helpers import load_data
 
 # Mock Nudge class
@@ -290,4 +290,86 @@ def test_process_deals_low_urgency(
     with patch("app.core.processor.MIN_IDLE_DAYS", 5), patch("app.core.processor.MIN_URGENCY", 1000):
         nudges = process_deals(today)
     
-    assert len(nudges) == 0, "Expected no nudges for low urgency or idle days"
\ No newline at end of file
+    assert len(nudges) == 0, "Expected no nudges for low urgency or idle days"
+
+# Tests for resolve_owner
+def test_resolve_owner_prefers_crm_column():
+    row = pd.Series({"deal_id": "OPP-123", "owner": " rep.a@nudge.ai "})
+    thread = [{"from": "rep.b@nudge.ai", "to": "marie.cfo@acme.com", "ts": "2025-07-01T09:00:00Z"}]
+    assert resolve_owner(row, thread, {"rep.b@nudge.ai"}) == "rep.a@nudge.ai"
+
+def test_resolve_owner_from_thread_participant():
+    row = pd.Series({"deal_id": "OPP-123", "owner": float("nan")})
+    thread = [
+        {"from": "marie.cfo@acme.com", "to": "rep.b@nudge.ai", "ts": "2025-07-01T09:00:00Z"},
+        {"from": "rep.b@nudge.ai", "to": "marie.cfo@acme.com", "ts": "2025-07-01T09:45:00Z"},
+    ]
+    assert resolve_owner(row, thread, {"rep.b@nudge.ai"}) == "rep.b@nudge.ai"
+    # No known rep: the deal is left unowned rather than filed under the buyer
+    assert resolve_owner(row, thread, set()) is None
+
+# Test process_deals_by_owner
+@patch("app.core.processor.load_data")
+@patch("app.core.classifier.detect_tone")
+@patch("app.core.generator.generate_nudge")
+def test_process_deals_by_owner(mock_generate_nudge, mock_detect_tone, mock_load_data, today, monkeypatch):
+    monkeypatch.setenv("REP_EMAILS", "rep.b@nudge.ai")
+    monkeypatch.setenv("YOUR_EMAIL", "rep.c@nudge.ai")
+    crm_df = pd.DataFrame([
+        {"deal_id": "OPP-1", "stage": "Proposal", "deal_name": "Alpha", "last_activity": "2025-07-01T12:00:00Z", "amount_eur": 5000, "owner": "rep.a@nudge.ai"},
+        {"deal_id": "OPP-2", "stage": "Pricing", "deal_name": "Beta", "last_activity": "2025-07-01T12:00:00Z", "amount_eur": 5000, "owner": None},
+        {"deal_id": "OPP-3", "stage": "Demo", "deal_name": "Gamma", "last_activity": "2025-07-01T12:00:00Z", "amount_eur": 5000, "owner": "rep.a@nudge.ai"},
+        {"deal_id": "OPP-4", "stage": "Demo", "deal_name": "Delta", "last_activity": "2025-07-01T12:00:00Z", "amount_eur": 5000, "owner": None},
+        {"deal_id": "OPP-5", "stage": "Demo", "deal_name": "Epsilon", "last_activity": "2025-07-01T12:00:00Z", "amount_eur": 5000, "owner": None},
+        {"deal_id": "OPP-6", "stage": "Pricing", "deal_name": "Zeta", "last_activity": "2025-07-01T12:00:00Z", "amount_eur": 5000, "owner": None},
+        {"deal_id": "OPP-7", "stage": "Pricing", "deal_name": "Eta", "last_activity": "2025-07-01T12:00:00Z", "amount_eur": 5000, "owner": None},
+    ])
+    emails = [
+        {"deal_id": "OPP-1", "thread": [
+            {"from": "rep.a@nudge.ai", "to": "marie.cfo@acme.com", "ts": "2025-07-01T09:00:00Z"},
+            {"from": "marie.cfo@acme.com", "to": "rep.a@nudge.ai", "ts": "2025-07-01T09:30:00Z", "body": "Thanks"},
+        ]},
+        {"deal_id": "OPP-2", "thread": [
+            # Internal note between reps before the buyer is contacted
+            {"from": "rep.b@nudge.ai", "to": "rep.a@nudge.ai", "ts": "2025-07-01T08:00:00Z", "body": "Taking Globex"},
+            {"from": "rep.b@nudge.ai", "to": "bob@globex.com", "ts": "2025-07-01T09:00:00Z"},
+            {"from": "bob@globex.com", "to": "rep.b@nudge.ai", "ts": "2025-07-01T10:00:00Z", "body": "Ok"},
+        ]},
+        {"deal_id": "OPP-3", "thread": [
+            {"from": "rep.a@nudge.ai", "to": "joe@initech.com", "ts": "2025-07-01T09:00:00Z"},
+        ]},
+        {"deal_id": "OPP-4", "thread": [
+            {"from": "lead@umbrella.com", "to": "rep.c@nudge.ai", "ts": "2025-07-01T09:00:00Z", "body": "Interested"},
+            {"from": "rep.c@nudge.ai", "to": "lead@umbrella.com", "ts": "2025-07-01T10:00:00Z", "body": "Happy to demo"},
+        ]},
+        {"deal_id": "OPP-5", "thread": [
+            {"from": "lead@hooli.com", "to": "someone@hooli.com", "ts": "2025-07-01T09:00:00Z", "body": "Fwd"},
+        ]},
+        {"deal_id": "OPP-6", "thread": [
+            # Inbound lead handed off from rep.b to rep.a
+            {"from": "ann@stark.com", "to": "rep.b@nudge.ai", "ts": "2025-07-01T08:00:00Z", "body": "Pricing?"},
+            {"from": "rep.b@nudge.ai", "to": "rep.a@nudge.ai", "ts": "2025-07-01T08:30:00Z", "body": "Can you take this?"},
+            {"from": "rep.a@nudge.ai", "to": "ann@stark.com", "ts": "2025-07-01T09:00:00Z", "body": "Sending pricing"},
+        ]},
+        {"deal_id": "OPP-7", "thread": [
+            {"from": "rep.a@nudge.ai", "to": "rep.b@nudge.ai", "ts": "2025-07-01T09:00:00Z", "body": "Internal only"},
+        ]},
+    ]
+    mock_load_data.return_value = (crm_df, emails)
+    mock_detect_tone.return_value = "formal"
+    mock_generate_nudge.return_value = "Send the pricing doc"
+
+    grouped = process_deals_by_owner(today, coalesce=False)
+
+    assert mock_load_data.call_count == 1
+    # OPP-5 has no known rep in its thread and OPP-7 only reps, so both are skipped
+    assert sorted(grouped) == ["rep.a@nudge.ai", "rep.b@nudge.ai", "rep.c@nudge.ai"]
+    assert [n.deal_id for n in grouped["rep.a@nudge.ai"]] == ["OPP-1", "OPP-3"]
+    assert grouped["rep.a@nudge.ai"][0].contact == "marie.cfo@acme.com"
+    assert grouped["rep.a@nudge.ai"][0].reply_speed == 30.0
+    assert [n.deal_id for n in grouped["rep.b@nudge.ai"]] == ["OPP-2", "OPP-6"]
+    assert grouped["rep.b@nudge.ai"][0].contact == "bob@globex.com"
+    assert grouped["rep.b@nudge.ai"][1].contact == "ann@stark.com"
+    assert grouped["rep.b@nudge.ai"][0].reply_speed == 60.0
+    assert [n.deal_id for n in grouped["rep.c@nudge.ai"]] == ["OPP-4"]
+    assert grouped["rep.c@nudge.ai"][0].contact == "lead@umbrella.com"
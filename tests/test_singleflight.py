@@ -0,0 +1,144 @@
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+import app.utils.singleflight as singleflight
+from app.utils.singleflight import SingleFlight
+
+FOLLOWERS = 9
+
+class _CountingEvent(threading.Event):
+    """Event that records how many callers are blocked waiting on it."""
+
+    def __init__(self):
+        super().__init__()
+        self.waiters = 0
+        self._count_lock = threading.Lock()
+
+    def wait(self, timeout=None):
+        with self._count_lock:
+            self.waiters += 1
+        return super().wait(timeout)
+
+@pytest.fixture
+def in_flight(monkeypatch):
+    """Track in-flight calls so a leader can wait until every follower is queued."""
+    calls = []
+
+    class _CountingCall(singleflight._Call):
+        def __init__(self):
+            super().__init__()
+            self.done = _CountingEvent()
+            calls.append(self)
+
+    monkeypatch.setattr(singleflight, "_Call", _CountingCall)
+
+    def wait_for_followers(count=FOLLOWERS, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while not (calls and calls[-1].done.waiters >= count):
+            if time.monotonic() > deadline:
+                raise AssertionError("followers never joined the in-flight call")
+            time.sleep(0.001)
+
+    return wait_for_followers
+
+def _run_concurrently(target, count=FOLLOWERS + 1):
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(target())) for _ in range(count)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+def test_concurrent_calls_share_one_execution(in_flight):
+    """Test concurrent calls with the same key run the function once and share its result."""
+    flight = SingleFlight()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        in_flight()
+        return ["nudge"]
+
+    results = _run_concurrently(lambda: flight.do("key", slow))
+
+    assert len(calls) == 1
+    assert len(results) == FOLLOWERS + 1
+    assert all(r is results[0] for r in results)
+
+def test_different_keys_run_separately():
+    """Test calls with different keys are not coalesced."""
+    flight = SingleFlight()
+    assert flight.do("a", lambda: 1) == 1
+    assert flight.do("b", lambda: 2) == 2
+
+def test_sequential_calls_recompute():
+    """Test a finished call is not cached for later callers."""
+    flight = SingleFlight()
+    counter = iter(range(10))
+    assert flight.do("key", lambda: next(counter)) == 0
+    assert flight.do("key", lambda: next(counter)) == 1
+
+def test_error_is_propagated_and_key_released():
+    """Test exceptions reach the caller and do not block the key."""
+    flight = SingleFlight()
+
+    def boom():
+        raise ValueError("failed")
+
+    with pytest.raises(ValueError):
+        flight.do("key", boom)
+    assert flight.do("key", lambda: "ok") == "ok"
+
+def test_concurrent_process_deals_load_data_once(in_flight):
+    """Test concurrent runs over the same data and day share a single load_data call."""
+    import pandas as pd
+    from datetime import datetime, timezone
+    from app.core.processor import process_deals
+
+    today = datetime(2025, 7, 10, 17, 20, tzinfo=timezone.utc)
+
+    def load_data():
+        in_flight()
+        return pd.DataFrame(columns=["deal_id", "deal_name", "amount_eur", "stage", "last_activity"]), []
+
+    with patch("app.core.processor.load_data", side_effect=load_data) as mock_load_data:
+        results = _run_concurrently(lambda: process_deals(today))
+
+    assert mock_load_data.call_count == 1
+    assert all(r is results[0] for r in results)
+
+def test_concurrent_generate_nudge_calls_openai_once(in_flight):
+    """Test concurrent generations of the same prompt send a single OpenAI request."""
+    from app.core.generator import generate_nudge
+
+    response = MagicMock()
+    response.choices[0].message.content = " Share the ROI table before Friday's pricing call. "
+    client = MagicMock()
+
+    def create(**kwargs):
+        in_flight()
+        return response
+
+    client.chat.completions.create.side_effect = create
+
+    with patch("app.core.generator.OpenAI", return_value=client):
+        results = _run_concurrently(
+            lambda: generate_nudge("OPP-123", "marie.cfo@acme.com", "formal", 45.0, "ACME Suite", "Proposal")
+        )
+
+    assert client.chat.completions.create.call_count == 1
+    assert results == ["Share the ROI table before Friday's pricing call."] * (FOLLOWERS + 1)
+
+def test_generate_nudge_without_coalescing_skips_flight():
+    """Test coalesce=False sends the prompt directly instead of joining an in-flight call."""
+    from app.core import generator
+
+    with patch.object(generator, "_nudge_flight") as mock_flight, \
+            patch.object(generator, "_generate_nudge", return_value="Share the ROI table.") as mock_generate:
+        result = generator.generate_nudge("OPP-123", "marie.cfo@acme.com", "formal", 45.0, "ACME Suite", "Proposal", coalesce=False)
+
+    assert result == "Share the ROI table."
+    mock_generate.assert_called_once()
+    mock_flight.do.assert_not_called()